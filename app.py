@@ -1,89 +1,428 @@
 import os
+import re
+import string
 import cv2
 import numpy as np
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Request, Response, render_template, request, send_file, jsonify
 from flask_cors import CORS  
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
-from io import BytesIO
 import zipfile
 import uuid
-import json
+import orjson
+import hashlib
+import logging
+import threading
+import time
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+try:
+    import fcntl
+except ImportError:  # Windows (IIS) has no flock; the in-process lock still applies
+    fcntl = None
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 
-import easyocr
 import tempfile
 import gradio as gr
 
 
+UPLOAD_SPOOL_SIZE = 16 * 1024 * 1024
+
+
+class UploadRequest(Request):
+    """Keep uploaded files in memory up to UPLOAD_SPOOL_SIZE instead of Werkzeug's 500 KB.
+
+    Uploads are read into memory for decoding anyway, so spooling a typical
+    slide to a temp file first only adds a disk write and read back.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode='rb+')
+
+
+# Per-slide detail is DEBUG; set LOG_LEVEL=DEBUG to see it (unknown levels fall back to INFO)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    LOG_LEVEL = 'INFO'
+logging.basicConfig(level=LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)  
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+app.config['MAX_CONTENT_LENGTH'] = 256 * 1024 * 1024
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 temp_dir = 'static/temp'
 os.makedirs(temp_dir, exist_ok=True)
-db_file = 'brand_visual_db.json'
-
-
-
-# Initialize EasyOCR with custom directories to avoid permission issues
-try:
-    # Create custom directories in the application folder (writable)
-    app_dir = os.path.dirname(os.path.abspath(__file__))
-    custom_model_dir = os.path.join(app_dir, "easyocr_models")
-    user_network_dir = os.path.join(app_dir, "easyocr_cache")
-    
-    os.makedirs(custom_model_dir, exist_ok=True)
-    os.makedirs(user_network_dir, exist_ok=True)
-    
-    # Initialize reader with explicit paths
-    reader = easyocr.Reader(
-        ['en'],
-        model_storage_directory=custom_model_dir,
-        user_network_directory=user_network_dir,
-        gpu=False  # Set to True if you have CUDA GPU support
-    )
-    print(f"✅ EasyOCR initialized successfully")
-    print(f"   Model dir: {custom_model_dir}")
-    print(f"   Cache dir: {user_network_dir}")
-    
-except Exception as e:
-    print(f"❌ Failed to initialize EasyOCR: {e}")
-    reader = None
+db_file = 'brand_visual_db.jsonl'
+legacy_db_file = 'brand_visual_db.json'
+ocr_cache_file = 'ocr_cache.jsonl'
+
+
+
+# OCR runs in a shared ocr_worker process when configured, otherwise in-process
+OCR_WORKER_ADDRESS = os.environ.get('OCR_WORKER_ADDRESS')
+if OCR_WORKER_ADDRESS:
+    from ocr_worker import OcrClient
+    extract_main_text_batch = OcrClient(OCR_WORKER_ADDRESS).extract_main_text_batch
+else:
+    import ocr_engine
+    ocr_engine.load_reader(os.path.dirname(os.path.abspath(__file__)))
+    extract_main_text_batch = ocr_engine.extract_main_text_batch
+
+# OCR results keyed by the content ID of the image bytes, so re-uploaded slides skip inference
+OCR_CACHE_SIZE = 4096
+# The append-only cache log is compacted back to OCR_CACHE_SIZE entries past this size
+OCR_CACHE_COMPACT_SIZE = 1024 * 1024
+OCR_ERRORS = ("OCR not available", "OCR failed")
+ocr_cache_lock = threading.Lock()
+
+# Temp uploads are shared by identical uploads, so they are purged by age rather than on confirm.
+# Uploading or confirming a file refreshes its mtime; only content-ID names are ever purged.
+TEMP_FILE_TTL = 24 * 60 * 60
+# The purge scans the whole temp folder, so uploads run it at most this often (seconds)
+TEMP_PURGE_INTERVAL = 5 * 60
+TEMP_UPLOAD_NAME = re.compile(r'[0-9a-f]{32}(\.\w+)?', re.ASCII)
+temp_purge = {'last': 0.0}
+temp_purge_lock = threading.Lock()
+
+# Decoded uploads are kept only at OCR size (same as ocr_engine.OCR_MAX_SIDE, which isn't
+# imported when OCR runs in ocr_worker); the temp file keeps full resolution
+OCR_MAX_SIDE = 1280
+
+# Uploads starting with this are stored as-is on confirm; anything else is re-encoded
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9 _-]')
+# ASCII fast path for safe_filename: str.translate skips the regex engine entirely
+SAFE_FILENAME_TABLE = {
+    c: '_' for c in range(0x80)
+    if chr(c) not in string.ascii_letters + string.digits + ' _-'
+}
 
 
 def run_app():
     return "App running"
 
-def load_db():
-    """Load database from JSON file"""
-    if os.path.exists(db_file):
-        with open(db_file, 'r') as f:
-            return json.load(f)
-    return []
+# Parsed DB entries, reused until the file's mtime/size change
+db_cache = {'stamp': None, 'entries': []}
+db_lock = threading.Lock()
 
 
-def save_db(data):
-    """Save database to JSON file"""
-    with open(db_file, 'w') as f:
-        json.dump(data, f, indent=2)
+def load_db():
+    """Load database from JSON Lines file (one entry per line)"""
+    if not os.path.exists(db_file):
+        return []
+    stat = os.stat(db_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with db_lock:
+        if db_cache['stamp'] != stamp:
+            with open(db_file, 'rb') as f:
+                db_cache['entries'] = [orjson.loads(line) for line in f if line.strip()]
+            db_cache['stamp'] = stamp
+        return db_cache['entries']
+
+
+@contextmanager
+def file_lock(f):
+    """Hold an exclusive flock on an open file where the platform supports it"""
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_entry(entry):
+    """Append one entry to the database without rewriting existing ones"""
+    line = orjson.dumps(entry) + b"\n"
+    with db_lock, open(db_file, 'ab') as f, file_lock(f):
+        f.write(line)
+        f.flush()
+
+
+def migrate_legacy_db():
+    """Convert the old single-array JSON database to JSON Lines once"""
+    if os.path.exists(db_file) or not os.path.exists(legacy_db_file):
+        return
+    with open(legacy_db_file, 'rb') as f:
+        entries = orjson.loads(f.read())
+    with open(db_file, 'wb') as f:
+        for entry in entries:
+            f.write(orjson.dumps(entry) + b"\n")
+    print(f"✅ Migrated {len(entries)} entries from {legacy_db_file} to {db_file}")
+
+
+migrate_legacy_db()
+
+
+def read_ocr_cache(f):
+    """Parse the OCR cache log into an LRU dict; later lines win, oldest entries beyond OCR_CACHE_SIZE drop"""
+    cache = OrderedDict()
+    for line in f:
+        try:
+            key, text = orjson.loads(line)
+        except (orjson.JSONDecodeError, ValueError):
+            continue
+        cache[key] = text
+        cache.move_to_end(key)
+    while len(cache) > OCR_CACHE_SIZE:
+        cache.popitem(last=False)
+    return cache
+
+
+def load_ocr_cache():
+    """Load the OCR result cache from disk"""
+    if os.path.exists(ocr_cache_file):
+        with open(ocr_cache_file, 'rb') as f:
+            return read_ocr_cache(f)
+    return OrderedDict()
+
+
+def append_ocr_cache(entries):
+    """Append new (key, text) results to the cache log.
+
+    Each worker only appends its own lines, so nothing another worker wrote is
+    lost. Once the log outgrows OCR_CACHE_COMPACT_SIZE it is rewritten in place
+    with the newest OCR_CACHE_SIZE entries, under the same lock.
+    """
+    data = b"".join(orjson.dumps(entry) + b"\n" for entry in entries)
+    with ocr_cache_lock, open(ocr_cache_file, 'ab+') as f, file_lock(f):
+        f.write(data)
+        f.flush()
+        if f.tell() <= OCR_CACHE_COMPACT_SIZE:
+            return
+        f.seek(0)
+        compacted = read_ocr_cache(f)
+        f.seek(0)
+        f.truncate()
+        f.write(b"".join(orjson.dumps(item) + b"\n" for item in compacted.items()))
 
 
-def extract_main_text(image_path):
-    """Extract the text with largest font size visually (by bounding box height)."""
-    if reader is None:
-        return "OCR not available"
-    
+try:
+    ocr_cache = load_ocr_cache()
+except Exception as e:
+    print(f"⚠️ Ignoring unreadable OCR cache: {e}")
+    ocr_cache = OrderedDict()
+
+
+def extract_texts(uploads):
+    """OCR saved uploads, reusing cached text for images seen before."""
+    texts = []
+    with ocr_cache_lock:
+        for upload in uploads:
+            text = ocr_cache.get(upload['id'])
+            if text is not None:
+                ocr_cache.move_to_end(upload['id'])
+            texts.append(text)
+
+    misses = [i for i, text in enumerate(texts) if text is None]
+    if not misses:
+        return texts
+
+    fresh = extract_main_text_batch([uploads[i]['image'] for i in misses])
+    new_entries = []
+    with ocr_cache_lock:
+        for i, text in zip(misses, fresh):
+            texts[i] = text
+            if text not in OCR_ERRORS:
+                ocr_cache[uploads[i]['id']] = text
+                new_entries.append((uploads[i]['id'], text))
+        while len(ocr_cache) > OCR_CACHE_SIZE:
+            ocr_cache.popitem(last=False)
+    if new_entries:
+        append_ocr_cache(new_entries)
+    return texts
+
+
+def content_id(data):
+    """Stable ID for uploaded bytes, so identical uploads share a temp file and OCR cache entry."""
+    if blake3 is not None:
+        return blake3.blake3(data).hexdigest()[:32]
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def temp_upload_path(id_, ext):
+    """Temp path for a client-supplied id/ext, or None unless it names a content_id() upload.
+
+    Keeps the confirm endpoints from touching, reading or deleting anything
+    outside the temp folder.
+    """
+    name = f"{id_}{ext}"
+    if not TEMP_UPLOAD_NAME.fullmatch(name):
+        return None
+    return os.path.join(temp_dir, name)
+
+
+def touch_temp_upload(temp_path):
+    """Refresh a temp upload's mtime so the purge keeps it; False if it no longer exists."""
     try:
-        results = reader.readtext(image_path)
-        if not results:
-            return "No text detected"
-
-        largest = max(results, key=lambda x: abs(x[0][0][1] - x[0][3][1]))
-        text = largest[1].strip()
-        return text
-    except Exception as e:
-        print("❌ OCR Error:", e)
-        return "OCR failed"
+        os.utime(temp_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def purge_temp_files():
+    """Delete temp uploads nobody has uploaded or confirmed within TEMP_FILE_TTL seconds.
+
+    Does nothing if a purge already ran in this process within TEMP_PURGE_INTERVAL.
+    """
+    now = time.time()
+    with temp_purge_lock:
+        if now - temp_purge['last'] < TEMP_PURGE_INTERVAL:
+            return
+        temp_purge['last'] = now
+    cutoff = now - TEMP_FILE_TTL
+    for entry in os.scandir(temp_dir):
+        # Anything not named by content_id() (e.g. files shipped in the repo) is left alone
+        if not TEMP_UPLOAD_NAME.fullmatch(entry.name):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def shrink_for_ocr(img):
+    """Downscale a decoded upload so its longest side is at most OCR_MAX_SIDE."""
+    h, w = img.shape[:2]
+    scale = OCR_MAX_SIDE / max(h, w)
+    if scale >= 1:
+        return img
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def save_temp_uploads(files):
+    """Decode uploaded files once and save the valid ones to the temp folder."""
+    purge_temp_files()
+    uploads = []
+    for file in files:
+        filename = secure_filename(file.filename)
+        if not filename:
+            continue
+        name, ext = os.path.splitext(filename)
+        # Decode straight from the upload; OCR reuses this array instead of re-reading the file
+        data = file.read()
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        # Only the OCR-sized copy is held until the whole request has been OCR'd
+        img = shrink_for_ocr(img)
+        unique_id = content_id(data)
+        temp_path = os.path.join(temp_dir, f"{unique_id}{ext}")
+        # Same bytes already uploaded: just keep the file out of the purge. If the purge
+        # got to it first, utime fails and the file is written again.
+        if not touch_temp_upload(temp_path):
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+        uploads.append({
+            'id': unique_id,
+            'filename': filename,
+            'ext': ext,
+            'temp_path': temp_path,
+            'image': img
+        })
+    return uploads
+
+
+def safe_filename(text):
+    """Replace anything but letters, digits, space, '-' and '_' so OCR text is usable as a filename."""
+    safe_name = text.translate(SAFE_FILENAME_TABLE)
+    if not safe_name.isascii():
+        safe_name = UNSAFE_FILENAME_CHARS.sub('_', safe_name)
+    return safe_name or 'unnamed'
+
+
+def unique_namer(used_names):
+    """Return a function mapping a safe name to an unused '<name>.png' or '<name>_<n>.png'.
+
+    Taken names live in a set and each base remembers its last suffix, so
+    every lookup is O(1) instead of re-probing from _1.
+    """
+    used = set(used_names)
+    counters = defaultdict(int)
+
+    def unique(base_name):
+        filename = f"{base_name}.png"
+        while filename in used:
+            counters[base_name] += 1
+            filename = f"{base_name}_{counters[base_name]}.png"
+        used.add(filename)
+        return filename
+
+    return unique
+
+
+def png_bytes(temp_path):
+    """Return PNG bytes for a temp upload, copying PNGs as-is and re-encoding anything else.
+
+    The check is on the file signature, not the extension, so a JPEG uploaded
+    as ``.png`` is still converted.
+    """
+    with open(temp_path, 'rb') as f:
+        data = f.read()
+    if data[:8] == PNG_SIGNATURE:
+        return data
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    # Level 1 is nearly as fast as 0 but doesn't inflate the file 3-5x
+    success, encoded_img = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    if not success:
+        return None
+    return encoded_img.tobytes()
+
+
+class ZipChunkWriter:
+    """Unseekable file-like sink that collects zip bytes until the response drains them."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """Yield a zip archive chunk by chunk from (arcname, data) pairs.
+
+    Entries are produced lazily, so only one image is held in memory and the
+    download starts as soon as the first entry is compressed.
+    """
+    sink = ZipChunkWriter()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for arcname, data in entries:
+            zip_file.writestr(arcname, data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def zip_response(entries, download_name):
+    """Stream a zip download built from (arcname, data) pairs."""
+    return Response(
+        stream_zip(entries),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
 
 
 @app.route('/')
@@ -112,25 +451,15 @@ def upload():
         if mode == 'single' and len(files) != 1:
             return jsonify({'error': 'Single mode requires exactly one image'}), 400
 
+        uploads = save_temp_uploads(files)
+        texts = extract_texts(uploads)
         results = []
-        for file in files:
-            filename = secure_filename(file.filename)
-            if not filename:
-                continue
-            unique_id = str(uuid.uuid4())
-            name, ext = os.path.splitext(filename)
-            temp_path = os.path.join(temp_dir, f"{unique_id}{ext}")
-            file.save(temp_path)
-            img = cv2.imread(temp_path)
-            if img is None:
-                os.remove(temp_path)
-                continue
-            text = extract_main_text(temp_path)
+        for upload, text in zip(uploads, texts):
             results.append({
-                'id': unique_id,
+                'id': upload['id'],
                 'text': text,
-                'preview': temp_path.replace(os.sep, '/'),
-                'ext': ext
+                'preview': upload['temp_path'].replace(os.sep, '/'),
+                'ext': upload['ext']
             })
 
         if not results:
@@ -138,6 +467,9 @@ def upload():
 
         return jsonify({'mode': mode, 'results': results})
 
+    except HTTPException:
+        # e.g. 413 from MAX_CONTENT_LENGTH; let Flask answer with the real status
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -152,27 +484,17 @@ def upload_brand_slides():
         if not files:
             return jsonify({'error': 'No images uploaded'}), 400
 
+        uploads = save_temp_uploads(files)
+        # Extract text using OCR
+        texts = extract_texts(uploads)
         results = []
-        for file in files:
-            filename = secure_filename(file.filename)
-            if not filename:
-                continue
-            unique_id = str(uuid.uuid4())
-            name, ext = os.path.splitext(filename)
-            temp_path = os.path.join(temp_dir, f"{unique_id}{ext}")
-            file.save(temp_path)
-            img = cv2.imread(temp_path)
-            if img is None:
-                os.remove(temp_path)
-                continue
-            # Extract text using OCR
-            text = extract_main_text(temp_path)
+        for upload, text in zip(uploads, texts):
             results.append({
-                'id': unique_id,
+                'id': upload['id'],
                 'text': text,
-                'preview': temp_path.replace(os.sep, '/'),
-                'ext': ext,
-                'filename': filename
+                'preview': upload['temp_path'].replace(os.sep, '/'),
+                'ext': upload['ext'],
+                'filename': upload['filename']
             })
 
         if not results:
@@ -180,6 +502,8 @@ def upload_brand_slides():
 
         return jsonify({'results': results})
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -190,7 +514,7 @@ def upload_brand_slides():
 def save_brand_visual():
     """Save brand visual data using OCR extracted text as filename"""
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         brand_name = data.get('brandName', '').strip()
         slides = data.get('slides', [])
         sequence = data.get('sequence', 1)
@@ -198,79 +522,54 @@ def save_brand_visual():
         if not brand_name or not slides:
             return jsonify({'error': 'Brand name and slides are required'}), 400
 
-        print("\n" + "="*60)
-        print("🔥 BRAND VISUAL SAVE REQUEST")
-        print("="*60)
-        print(f"📌 Brand Name: {brand_name}")
-        print(f"📌 Sequence of Slide: {sequence}")
-        print(f"📌 Total Slides: {len(slides)}")
-        print("-"*60)
+        logger.debug("🔥 Brand visual save request: brand=%s sequence=%s slides=%d",
+                     brand_name, sequence, len(slides))
 
-        # Load existing database
-        db = load_db()
-        
         # Create entry
         entry_id = str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
         
         # Process and save images using OCR text as filename
         saved_images = []
-        zip_buffer = BytesIO()
+        unique_name = unique_namer(os.listdir(app.config['UPLOAD_FOLDER']))
         
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for idx, slide in enumerate(slides):
-                slide_id = slide['id']
-                slide_text = slide['text'].strip()
-                ext = slide['ext']
-                temp_path = os.path.join(temp_dir, f"{slide_id}{ext}")
-                
-                if not os.path.exists(temp_path):
-                    continue
-                
-                img = cv2.imread(temp_path)
-                if img is None:
-                    os.remove(temp_path)
-                    continue
-                
-                # Use OCR extracted text as filename (your original logic)
-                safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in slide_text)
-                if not safe_name:
-                    safe_name = 'unnamed'
-                
-                final_filename = f"{safe_name}.png"
-                final_path = os.path.join(app.config['UPLOAD_FOLDER'], final_filename)
-                
-                # Handle duplicate filenames
-                base_name = safe_name
-                counter = 1
-                while os.path.exists(final_path):
-                    final_filename = f"{base_name}_{counter}.png"
-                    final_path = os.path.join(app.config['UPLOAD_FOLDER'], final_filename)
-                    counter += 1
-                
-                # Save image
-                success = cv2.imwrite(final_path, img, [cv2.IMWRITE_PNG_COMPRESSION, 0])
-                
-                if success:
-                    # Add to zip
-                    encoded_success, encoded_img = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, 0])
-                    if encoded_success:
-                        zip_file.writestr(final_filename, encoded_img.tobytes())
-                    
-                    saved_images.append({
-                        'filename': final_filename,
-                        'ocr_text': slide_text,
-                        'path': final_path.replace(os.sep, '/'),
-                        'order': idx + 1
-                    })
-                    
-                    print(f"✅ Slide {idx + 1}:")
-                    print(f"   - OCR Text: {slide_text}")
-                    print(f"   - Saved As: {final_filename}")
-                    print(f"   - Path: {final_path}")
-                
-                # Clean up temp file
+        for idx, slide in enumerate(slides):
+            slide_id = slide['id']
+            slide_text = slide['text'].strip()
+            ext = slide['ext']
+            temp_path = temp_upload_path(slide_id, ext)
+            
+            if temp_path is None or not touch_temp_upload(temp_path):
+                continue
+            
+            png_data = png_bytes(temp_path)
+            if png_data is None:
                 os.remove(temp_path)
+                continue
+            
+            # Use OCR extracted text as filename (your original logic)
+            safe_name = safe_filename(slide_text)
+            
+            # Handle duplicate filenames; 'xb' refuses a name another request
+            # took since the folder was listed, so the namer moves on to the next one
+            while True:
+                final_filename = unique_name(safe_name)
+                final_path = os.path.join(app.config['UPLOAD_FOLDER'], final_filename)
+                try:
+                    with open(final_path, 'xb') as f:
+                        f.write(png_data)
+                    break
+                except FileExistsError:
+                    continue
+            
+            saved_images.append({
+                'filename': final_filename,
+                'ocr_text': slide_text,
+                'path': final_path.replace(os.sep, '/'),
+                'order': idx + 1
+            })
+            
+            logger.debug("✅ Slide %d: OCR text %r saved as %s", idx + 1, slide_text, final_path)
         
         # Save to database
         db_entry = {
@@ -280,27 +579,26 @@ def save_brand_visual():
             'images': saved_images,
             'created_at': timestamp
         }
-        db.append(db_entry)
-        save_db(db)
+        save_entry(db_entry)
         
-        print("-"*60)
-        print(f"💾 Saved to Database:")
-        print(f"   - Entry ID: {entry_id}")
-        print(f"   - Total Files Saved: {len(saved_images)}")
-        print(f"   - Timestamp: {timestamp}")
-        print("="*60 + "\n")
+        logger.info("💾 Saved brand visual %s (%s): %d files, entry %s",
+                    brand_name, timestamp, len(saved_images), entry_id)
         
-        # Prepare zip for download
-        zip_buffer.seek(0)
-        zip_filename = f"brand_visual_slides.zip"
+        # Stream the saved images back as a zip
+        def saved_files():
+            for image in saved_images:
+                # Headers are already sent; skip a file removed since it was saved
+                try:
+                    with open(image['path'], 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                yield image['filename'], data
         
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=zip_filename
-        )
+        return zip_response(saved_files(), "brand_visual_slides.zip")
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -312,7 +610,7 @@ def get_brand_visuals():
     """Get all brand visual data"""
     try:
         db = load_db()
-        return jsonify(db)
+        return Response(orjson.dumps(db), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -320,20 +618,20 @@ def get_brand_visuals():
 @app.route('/confirm_single', methods=['POST'])
 def confirm_single():
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         id_ = data['id']
         text = data['text'].strip()
         ext = data['ext']
-        temp_path = os.path.join(temp_dir, f"{id_}{ext}")
-        if not os.path.exists(temp_path):
+        temp_path = temp_upload_path(id_, ext)
+        if temp_path is None:
+            return jsonify({'error': 'Invalid image id'}), 400
+        if not touch_temp_upload(temp_path):
             return jsonify({'error': 'Temp file not found'}), 404
-        img = cv2.imread(temp_path)
-        if img is None:
+        png_data = png_bytes(temp_path)
+        if png_data is None:
             os.remove(temp_path)
             return jsonify({'error': 'Failed to process image'}), 500
-        safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in text)
-        if not safe_name:
-            safe_name = 'unnamed'
+        safe_name = safe_filename(text)
         final_filename = f"{safe_name}.png"
         final_path = os.path.join(app.config['UPLOAD_FOLDER'], final_filename)
         base_name = safe_name
@@ -342,12 +640,11 @@ def confirm_single():
             final_filename = f"{base_name}_{counter}.png"
             final_path = os.path.join(app.config['UPLOAD_FOLDER'], final_filename)
             counter += 1
-        success = cv2.imwrite(final_path, img, [cv2.IMWRITE_PNG_COMPRESSION, 0])
-        if not success:
-            os.remove(temp_path)
-            return jsonify({'error': 'Failed to save image'}), 500
-        os.remove(temp_path)
+        with open(final_path, 'wb') as f:
+            f.write(png_data)
         return jsonify({'download_link': f"/download/{final_filename}"})
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -357,42 +654,40 @@ def confirm_single():
 @app.route('/confirm_bulk', methods=['POST'])
 def confirm_bulk():
     try:
-        data = request.get_json()
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for item in data:
-                id_ = item['id']
-                text = item['text'].strip()
-                ext = item['ext']
-                temp_path = os.path.join(temp_dir, f"{id_}{ext}")
-                if not os.path.exists(temp_path):
-                    continue
-                img = cv2.imread(temp_path)
-                if img is None:
-                    os.remove(temp_path)
+        data = orjson.loads(request.get_data())
+
+        if not isinstance(data, list):
+            return jsonify({'error': 'Expected a list of images'}), 400
+
+        # Validate the request and pick names up front; once the zip starts streaming
+        # the status is already sent, so the generator only reads and converts files
+        unique_name = unique_namer(())
+        renames = []
+        for item in data:
+            if not isinstance(item, dict) or not all(
+                isinstance(item.get(key), str) for key in ('id', 'text', 'ext')
+            ):
+                return jsonify({'error': 'Each image needs id, text and ext'}), 400
+            temp_path = temp_upload_path(item['id'], item['ext'])
+            if temp_path is None:
+                return jsonify({'error': 'Invalid image id'}), 400
+            if not touch_temp_upload(temp_path):
+                continue
+            renames.append((temp_path, unique_name(safe_filename(item['text'].strip()))))
+
+        def renamed_images():
+            for temp_path, zip_filename in renames:
+                try:
+                    png_data = png_bytes(temp_path)
+                except OSError:
                     continue
-                success, encoded_img = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, 0])
-                if not success:
-                    os.remove(temp_path)
+                if png_data is None:
                     continue
-                safe_name = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in text)
-                if not safe_name:
-                    safe_name = 'unnamed'
-                zip_filename = f"{safe_name}.png"
-                counter = 1
-                base_name = safe_name
-                while zip_filename in [f for f in zip_file.namelist()]:
-                    zip_filename = f"{base_name}_{counter}.png"
-                    counter += 1
-                zip_file.writestr(zip_filename, encoded_img.tobytes())
-                os.remove(temp_path)
-        zip_buffer.seek(0)
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name='extracted_images.zip'
-        )
+                yield zip_filename, png_data
+
+        return zip_response(renamed_images(), 'extracted_images.zip')
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,133 @@
+"""Export the EasyOCR detector and recognizer to ONNX for ocr_engine.
+
+Run once from the app folder: python export_onnx.py
+The recognizer is then INT8-quantized using text crops from static/uploads.
+"""
+import math
+import os
+
+import cv2
+import easyocr
+import numpy as np
+import torch
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+from ocr_engine import DETECTOR_ONNX, RECOGNIZER_INT8_ONNX, RECOGNIZER_ONNX
+
+# Number of text crops used to calibrate INT8 activation ranges
+CALIBRATION_CROPS = 200
+
+
+class _RecognizerExport(torch.nn.Module):
+    """EasyOCR's recognizer without the unused ``text`` argument, in an exportable form.
+
+    Mirrors ``easyocr.model.vgg_model.Model.forward``, except that
+    ``AdaptiveAvgPool2d((None, 1))`` can't be exported with a dynamic width, so
+    it is written as the equivalent mean over the feature-map height.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        visual_feature = self.model.FeatureExtraction(image)
+        visual_feature = visual_feature.permute(0, 3, 1, 2).mean(dim=3)
+        contextual_feature = self.model.SequenceModeling(visual_feature)
+        return self.model.Prediction(contextual_feature.contiguous())
+
+
+class _TextCropReader(CalibrationDataReader):
+    """Feed recognizer-ready text crops (1x1x64xW, normalized to [-1, 1]) to the calibrator."""
+
+    def __init__(self, reader, image_dir, limit=CALIBRATION_CROPS):
+        self.crops = []
+        for name in sorted(os.listdir(image_dir)):
+            img = cv2.imread(os.path.join(image_dir, name))
+            if img is None:
+                continue
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            # CRAFT expects RGB; EasyOCR passes ndarrays through unchanged
+            horizontal_list, _ = reader.detect(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            for x_min, x_max, y_min, y_max in horizontal_list[0]:
+                crop = gray[max(0, y_min):y_max, max(0, x_min):x_max]
+                if crop.size == 0:
+                    continue
+                width = max(32, math.ceil(64 * crop.shape[1] / crop.shape[0]))
+                crop = cv2.resize(crop, (width, 64), interpolation=cv2.INTER_CUBIC)
+                crop = (crop.astype(np.float32) / 255.0 - 0.5) / 0.5
+                self.crops.append(crop[np.newaxis, np.newaxis])
+                if len(self.crops) >= limit:
+                    break
+            if len(self.crops) >= limit:
+                break
+        self._iter = iter(self.crops)
+
+    def get_next(self):
+        crop = next(self._iter, None)
+        return None if crop is None else {'image': crop}
+
+
+def quantize_recognizer(reader, model_dir, image_dir):
+    """Write an INT8 (QDQ, per-channel) copy of the recognizer calibrated on real text crops."""
+    calibration = _TextCropReader(reader, image_dir)
+    if not calibration.crops:
+        print(f"⚠️ No text crops found in {image_dir}, skipping INT8 quantization")
+        return
+    quantize_static(
+        os.path.join(model_dir, RECOGNIZER_ONNX),
+        os.path.join(model_dir, RECOGNIZER_INT8_ONNX),
+        calibration,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+    )
+    print(f"✅ Quantized recognizer with {len(calibration.crops)} crops")
+
+
+def export_models(model_dir):
+    # quantize=False: EasyOCR's CPU default swaps in dynamic-quantized LSTM/Linear layers that can't be exported
+    reader = easyocr.Reader(['en'], model_storage_directory=model_dir, gpu=False, quantize=False)
+    detector = getattr(reader.detector, 'module', reader.detector).eval()
+    recognizer = getattr(reader.recognizer, 'module', reader.recognizer).eval()
+
+    with torch.no_grad():
+        torch.onnx.export(
+            detector,
+            torch.randn(1, 3, 640, 640),
+            os.path.join(model_dir, DETECTOR_ONNX),
+            input_names=['input'],
+            output_names=['output', 'feature'],
+            dynamic_axes={
+                'input': {0: 'batch', 2: 'height', 3: 'width'},
+                'output': {0: 'batch', 1: 'out_height', 2: 'out_width'},
+                'feature': {0: 'batch', 2: 'feat_height', 3: 'feat_width'},
+            },
+            opset_version=17,
+            # The TorchScript exporter honours dynamic_axes; dynamo bakes in the example shapes
+            dynamo=False,
+        )
+        torch.onnx.export(
+            _RecognizerExport(recognizer),
+            torch.randn(1, 1, 64, 256),
+            os.path.join(model_dir, RECOGNIZER_ONNX),
+            input_names=['image'],
+            output_names=['preds'],
+            dynamic_axes={
+                'image': {0: 'batch', 3: 'width'},
+                'preds': {0: 'batch', 1: 'steps'},
+            },
+            opset_version=17,
+            # The TorchScript exporter honours dynamic_axes; dynamo bakes in the example shapes
+            dynamo=False,
+        )
+    print(f"✅ Exported ONNX models to {model_dir}")
+    return reader
+
+
+if __name__ == "__main__":
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    model_dir = os.path.join(app_dir, "easyocr_models")
+    reader = export_models(model_dir)
+    quantize_recognizer(reader, model_dir, os.path.join(app_dir, "static", "uploads"))
@@ -0,0 +1,359 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import easyocr
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+# Exported networks live next to the EasyOCR .pth weights (see export_onnx.py)
+DETECTOR_ONNX = 'craft_mlt_25k.onnx'
+RECOGNIZER_ONNX = 'english_g2.onnx'
+RECOGNIZER_INT8_ONNX = 'english_g2_int8.onnx'
+
+# OCR inference runs in native code that releases the GIL, so bulk uploads are OCR'd in parallel
+EXECUTOR = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+# Larger uploads are downscaled before OCR; the saved file keeps full resolution
+OCR_MAX_SIDE = 1280
+
+# Batched OCR settings for multi-image uploads: similar-sized images are grouped and each
+# group is padded only to its own largest size. CRAFT needs ~1.8 GB of activations per
+# 1280px image on CPU, so detection runs OCR_DETECT_BATCH images at a time (also the
+# TensorRT profile's max batch); the recognizer batches OCR_BATCH_SIZE text crops.
+OCR_DETECT_BATCH = int(os.environ.get('OCR_DETECT_BATCH', 2))
+OCR_BATCH_SIZE = 16
+# An image joins a detection chunk only if the padded canvas stays within this factor of its own area
+OCR_PAD_SLACK = 1.25
+
+# Set by load_reader(); stays None if EasyOCR could not be initialized
+reader = None
+
+
+# TensorRT engines are built once per model/GPU and cached here (ORT tags the file with the SM arch)
+TRT_CACHE_DIR = 'trt_cache'
+
+# Widest recognizer input TensorRT builds for: a text line 40x wider than tall. EasyOCR pads
+# crops to ceil(max aspect ratio) * 64, so rarer, wider lines run on the next provider instead.
+RECOGNIZER_TRT_MAX_WIDTH = 2560
+
+# Optimization profiles (min, opt, max) for the dynamic input shapes of each exported model.
+# CRAFT gets images of at most OCR_MAX_SIDE rounded up to multiples of 32, however small.
+TRT_PROFILES = {
+    DETECTOR_ONNX: (
+        'input:1x3x32x32',
+        'input:1x3x960x1280',
+        f'input:{OCR_DETECT_BATCH}x3x{OCR_MAX_SIDE}x{OCR_MAX_SIDE}'
+    ),
+    RECOGNIZER_ONNX: ('image:1x1x64x32', 'image:16x1x64x256', f'image:64x1x64x{RECOGNIZER_TRT_MAX_WIDTH}'),
+    RECOGNIZER_INT8_ONNX: ('image:1x1x64x32', 'image:16x1x64x256', f'image:64x1x64x{RECOGNIZER_TRT_MAX_WIDTH}'),
+}
+
+# OpenVINO target for Intel installs without NVIDIA GPUs: CPU, GPU (iGPU) or AUTO
+OPENVINO_DEVICE = os.environ.get('OPENVINO_DEVICE', 'CPU')
+OPENVINO_CACHE_DIR = 'openvino_cache'
+
+
+def ort_providers(model_path):
+    """Execution providers to try, fastest first, limited to what this onnxruntime build ships."""
+    available = ort.get_available_providers()
+    model_dir, model_name = os.path.split(model_path)
+    providers = []
+
+    if 'TensorrtExecutionProvider' in available:
+        trt_options = {
+            'trt_fp16_enable': True,
+            # QDQ models carry their own scales, TensorRT just needs INT8 kernels allowed
+            'trt_int8_enable': model_name == RECOGNIZER_INT8_ONNX,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': os.path.join(model_dir, TRT_CACHE_DIR),
+        }
+        profile = TRT_PROFILES.get(model_name)
+        if profile:
+            trt_options['trt_profile_min_shapes'] = profile[0]
+            trt_options['trt_profile_opt_shapes'] = profile[1]
+            trt_options['trt_profile_max_shapes'] = profile[2]
+        providers.append(('TensorrtExecutionProvider', trt_options))
+
+    if 'CUDAExecutionProvider' in available:
+        providers.append('CUDAExecutionProvider')
+
+    if 'OpenVINOExecutionProvider' in available:
+        providers.append(('OpenVINOExecutionProvider', {
+            'device_type': OPENVINO_DEVICE,
+            'precision': 'FP16' if OPENVINO_DEVICE.startswith('GPU') else 'FP32',
+            'cache_dir': os.path.join(model_dir, OPENVINO_CACHE_DIR),
+        }))
+
+    providers.append('CPUExecutionProvider')
+    return providers
+
+
+def create_session(model_path, providers=None):
+    """Create an ONNX Runtime session with full graph optimizations enabled."""
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    so.intra_op_num_threads = os.cpu_count() or 1
+    return ort.InferenceSession(model_path, sess_options=so, providers=providers or ort_providers(model_path))
+
+
+class OnnxDetector:
+    """Drop-in replacement for EasyOCR's CRAFT module, backed by an ORT session.
+
+    EasyOCR calls ``detector(x)`` with a normalized NCHW tensor and only uses
+    the score map from the returned ``(y, feature)`` pair.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.output_name = session.get_outputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        y = self.session.run([self.output_name], {self.input_name: x.cpu().numpy()})[0]
+        return torch.from_numpy(y), None
+
+
+class OnnxRecognizer:
+    """Drop-in replacement for EasyOCR's CRNN module, backed by an ORT session.
+
+    EasyOCR passes ``(image, text_for_pred)``; the CTC model ignores the text
+    argument and EasyOCR decodes the returned logits itself.
+    """
+
+    def __init__(self, session, model_path):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.output_name = session.get_outputs()[0].name
+        # TensorRT rejects shapes outside its profile; wider inputs use a session without it
+        self.model_path = model_path if 'TensorrtExecutionProvider' in session.get_providers() else None
+        self.wide_session = None
+        self.wide_lock = threading.Lock()
+
+    def get_wide_session(self):
+        with self.wide_lock:
+            if self.wide_session is None:
+                providers = [
+                    p for p in ort_providers(self.model_path)
+                    if (p[0] if isinstance(p, tuple) else p) != 'TensorrtExecutionProvider'
+                ]
+                self.wide_session = create_session(self.model_path, providers)
+        return self.wide_session
+
+    def eval(self):
+        # recognizer_predict() calls model.eval() before every batch
+        return self
+
+    def __call__(self, image, text=None):
+        session = self.session
+        if self.model_path and image.shape[3] > RECOGNIZER_TRT_MAX_WIDTH:
+            session = self.get_wide_session()
+        preds = session.run([self.output_name], {self.input_name: image.cpu().numpy()})[0]
+        return torch.from_numpy(preds)
+
+
+def attach_onnx_models(reader, model_dir):
+    """Swap the reader's PyTorch networks for ONNX Runtime sessions when exported models exist.
+
+    Pre/post-processing (resize, box extraction, cropping, CTC decoding) stays
+    in EasyOCR so results match the PyTorch path. Returns True if ORT is used.
+    """
+    if ort is None:
+        return False
+
+    detector_path = os.path.join(model_dir, DETECTOR_ONNX)
+    recognizer_path = os.path.join(model_dir, RECOGNIZER_INT8_ONNX)
+    if not os.path.exists(recognizer_path):
+        recognizer_path = os.path.join(model_dir, RECOGNIZER_ONNX)
+    if not (os.path.exists(detector_path) and os.path.exists(recognizer_path)):
+        return False
+
+    detector_session = create_session(detector_path)
+    reader.detector = OnnxDetector(detector_session)
+    reader.recognizer = OnnxRecognizer(create_session(recognizer_path), recognizer_path)
+    print(f"✅ ONNX Runtime enabled ({', '.join(detector_session.get_providers())})")
+    return True
+
+
+def load_reader(app_dir):
+    """Initialize EasyOCR with custom directories to avoid permission issues, then warm it up."""
+    global reader
+    try:
+        # Create custom directories in the application folder (writable)
+        custom_model_dir = os.path.join(app_dir, "easyocr_models")
+        user_network_dir = os.path.join(app_dir, "easyocr_cache")
+        
+        os.makedirs(custom_model_dir, exist_ok=True)
+        os.makedirs(user_network_dir, exist_ok=True)
+        
+        # Initialize reader with explicit paths
+        reader = easyocr.Reader(
+            ['en'],
+            model_storage_directory=custom_model_dir,
+            user_network_directory=user_network_dir,
+            gpu=False  # Set to True if you have CUDA GPU support
+        )
+        # Run the networks through ONNX Runtime if exported models are present
+        attach_onnx_models(reader, custom_model_dir)
+        print(f"✅ EasyOCR initialized successfully")
+        print(f"   Model dir: {custom_model_dir}")
+        print(f"   Cache dir: {user_network_dir}")
+        
+    except Exception as e:
+        print(f"❌ Failed to initialize EasyOCR: {e}")
+        reader = None
+
+    warmup_reader()
+
+
+def warmup_reader():
+    """Run throwaway OCR passes so lazy kernel selection/engine builds happen before the first upload."""
+    if reader is None:
+        return
+    # Real text on the dummy image makes the recognizer run too, not just the detector
+    dummy = np.full((320, 320, 3), 255, dtype=np.uint8)
+    cv2.putText(dummy, "Warmup", (20, 180), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 4)
+    try:
+        readtext_bgr([dummy])
+        readtext_bgr(pad_batch_for_ocr([dummy] * OCR_DETECT_BATCH), batch_size=OCR_BATCH_SIZE)
+        print("✅ EasyOCR warmed up")
+    except Exception as e:
+        print(f"⚠️ EasyOCR warmup failed: {e}")
+
+
+def readtext_bgr(images, batch_size=1):
+    """Run EasyOCR's readtext on same-sized BGR arrays, one result list per image.
+
+    Given an ndarray, EasyOCR hands it to CRAFT unchanged, but the detector
+    expects RGB (its path loader converts). So, like readtext_batched, this
+    calls detect/recognize directly: CRAFT gets RGB and the recognizer a true
+    grayscale, matching what reading the file from disk would give.
+    """
+    rgb = np.stack([cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in images])
+    greys = [cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) for img in images]
+    horizontal_lists, free_lists = reader.detect(rgb, reformat=False)
+    return [
+        reader.recognize(grey, horizontal_list, free_list, batch_size=batch_size, reformat=False)
+        for grey, horizontal_list, free_list in zip(greys, horizontal_lists, free_lists)
+    ]
+
+
+def extract_main_text(image):
+    """Extract the text with largest font size visually (by bounding box height).
+
+    Accepts an image path or an already decoded BGR array.
+    """
+    if reader is None:
+        return "OCR not available"
+    
+    try:
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        results = readtext_bgr([downscale_for_ocr(image)])[0]
+        return largest_text(results)
+    except Exception as e:
+        print("❌ OCR Error:", e)
+        return "OCR failed"
+
+
+def extract_main_text_batch(images):
+    """Extract the main text of several images, batching detection over similar-sized ones."""
+    if reader is None:
+        return ["OCR not available"] * len(images)
+    if len(images) < 2:
+        return [extract_main_text(image) for image in images]
+
+    try:
+        images = [downscale_for_ocr(image) for image in images]
+        texts = [None] * len(images)
+        # CRAFT runs on a whole chunk in one forward pass, so chunking bounds detector memory
+        for chunk in size_chunks(images):
+            batch_results = readtext_bgr(
+                pad_batch_for_ocr([images[i] for i in chunk]),
+                batch_size=OCR_BATCH_SIZE
+            )
+            for i, results in zip(chunk, batch_results):
+                texts[i] = largest_text(results)
+        return texts
+    except Exception as e:
+        print("❌ Batched OCR Error:", e)
+        return list(EXECUTOR.map(extract_main_text, images))
+
+
+def downscale_for_ocr(img, max_side=OCR_MAX_SIDE):
+    """Shrink images whose longest side exceeds max_side; OCR cost grows with pixel count."""
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return img
+    # Keep at least one pixel per side for extreme aspect ratios
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def padded_size(shapes):
+    """Height and width of the canvas a batch of (h, w) shapes is padded to, multiples of 32."""
+    return (
+        -(-max(h for h, _ in shapes) // 32) * 32,
+        -(-max(w for _, w in shapes) // 32) * 32,
+    )
+
+
+def size_chunks(images):
+    """Group image indices into detection chunks of similar size, at most OCR_DETECT_BATCH each.
+
+    Images are visited smallest first; one starts a new chunk when adding it
+    would pad any member past OCR_PAD_SLACK times the area it gets alone.
+    """
+    order = sorted(range(len(images)), key=lambda i: images[i].shape[:2])
+    chunks = []
+    for i in order:
+        chunk = chunks[-1] if chunks else None
+        if chunk and len(chunk) < OCR_DETECT_BATCH:
+            shapes = [images[j].shape[:2] for j in chunk + [i]]
+            height, width = padded_size(shapes)
+            alone = min(h * w for h, w in map(padded_size, ([shape] for shape in shapes)))
+            if height * width <= OCR_PAD_SLACK * alone:
+                chunk.append(i)
+                continue
+        chunks.append([i])
+    return chunks
+
+
+def pad_batch_for_ocr(images):
+    """Pad images bottom/right to the batch's largest height and width, rounded up to 32.
+
+    CRAFT pads every input to a multiple of 32 anyway, so a batch of
+    same-sized slides costs no more detector pixels than running them alone.
+    Padding only at the far edges keeps box coordinates in each image's own
+    frame, so heights stay comparable within each slide.
+    """
+    height, width = padded_size([img.shape[:2] for img in images])
+    return [
+        cv2.copyMakeBorder(
+            img, 0, height - img.shape[0], 0, width - img.shape[1],
+            cv2.BORDER_CONSTANT, value=(0, 0, 0)
+        )
+        for img in images
+    ]
+
+
+def largest_text(results):
+    """Pick the text with the tallest bounding box from EasyOCR results."""
+    if not results:
+        return "No text detected"
+
+    # Box corners are (top-left, top-right, bottom-right, bottom-left); compare heights in one pass
+    boxes = np.asarray([r[0] for r in results], dtype=np.float32)
+    heights = np.abs(boxes[:, 3, 1] - boxes[:, 0, 1])
+    return results[int(heights.argmax())][1].strip()
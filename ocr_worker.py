@@ -0,0 +1,127 @@
+"""Shared OCR worker: loads the EasyOCR models once and serves every web worker.
+
+Run alongside the web app and point the app at it:
+
+    export OCR_WORKER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python ocr_worker.py                      # listens on OCR_WORKER_ADDRESS (127.0.0.1:6010)
+    OCR_WORKER_ADDRESS=127.0.0.1:6010 gunicorn -w 4 app:app
+
+Both sides must share the same OCR_WORKER_AUTHKEY; there is no default, since
+anyone who knows the key can make the worker unpickle arbitrary data.
+
+Decoded images are handed over through shared memory, so only their names
+and shapes cross the socket.
+"""
+import os
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+DEFAULT_ADDRESS = '127.0.0.1:6010'
+
+
+def worker_authkey():
+    """Shared secret for the manager connection, required on both the worker and the web side."""
+    authkey = os.environ.get('OCR_WORKER_AUTHKEY')
+    if not authkey:
+        raise RuntimeError("OCR_WORKER_AUTHKEY must be set to use the shared OCR worker")
+    return authkey.encode()
+
+
+class OcrManager(BaseManager):
+    pass
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class OcrService:
+    """Runs OCR in the worker process on images placed in shared memory by OcrClient.
+
+    The manager serves each client connection on its own thread, so a lock
+    makes requests take turns on the one reader instead of running several
+    GB-scale detection passes at once.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def extract_main_text_batch(self, shared_images):
+        import ocr_engine
+
+        handles = []
+        images = []
+        for name, shape, dtype in shared_images:
+            shm = shared_memory.SharedMemory(name=name)
+            # The client owns the block; stop this process's tracker from unlinking it on exit.
+            # Windows has no tracker for shared memory, and starting one there fails.
+            if os.name == 'posix':
+                resource_tracker.unregister(shm._name, 'shared_memory')
+            handles.append(shm)
+            images.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+        try:
+            with self.lock:
+                return ocr_engine.extract_main_text_batch(images)
+        finally:
+            del images
+            for shm in handles:
+                shm.close()
+
+
+class OcrClient:
+    """Web-side stand-in for ocr_engine.extract_main_text_batch that calls the shared worker."""
+
+    def __init__(self, address):
+        self.address = parse_address(address)
+        self.authkey = worker_authkey()
+        self.service = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            if self.service is None:
+                OcrManager.register('ocr_service')
+                manager = OcrManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self.service = manager.ocr_service()
+        return self.service
+
+    def extract_main_text_batch(self, images):
+        handles = []
+        try:
+            shared_images = []
+            for img in images:
+                shm = shared_memory.SharedMemory(create=True, size=max(img.nbytes, 1))
+                handles.append(shm)
+                np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+                shared_images.append((shm.name, img.shape, img.dtype.str))
+            return self.connect().extract_main_text_batch(shared_images)
+        except Exception as e:
+            print("❌ OCR worker error:", e)
+            with self.lock:
+                self.service = None
+            return ["OCR failed"] * len(images)
+        finally:
+            for shm in handles:
+                shm.close()
+                shm.unlink()
+
+
+def serve(address):
+    authkey = worker_authkey()
+    import ocr_engine
+
+    ocr_engine.load_reader(os.path.dirname(os.path.abspath(__file__)))
+    service = OcrService()
+    OcrManager.register('ocr_service', callable=lambda: service)
+    manager = OcrManager(address=parse_address(address), authkey=authkey)
+    print(f"✅ OCR worker listening on {address}")
+    manager.get_server().serve_forever()
+
+
+if __name__ == "__main__":
+    serve(os.environ.get('OCR_WORKER_ADDRESS', DEFAULT_ADDRESS))